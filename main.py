@@ -1,7 +1,7 @@
 import waveshare_lcd
 import text_renderer
 import asyncio
-import time
+import concurrent.futures
 from fastapi import FastAPI, BackgroundTasks
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
@@ -10,6 +10,8 @@ from contextlib import asynccontextmanager
 from fastapi.templating import Jinja2Templates
 from fastapi import Request
 import random
+import numpy as np
+from PIL import ImageColor
 from phrases import PHRASES
 
 class DisplayText(BaseModel):
@@ -17,22 +19,49 @@ class DisplayText(BaseModel):
     textColor: str = "#ffffff"  # Default white
     backgroundColor: str = "#000000"  # Default black
 
-# Global variable to control scrolling
+# Global variables to control scrolling
 current_scroll_task = None
+current_stop_event = None  # Set to make current_scroll_task stop at its next frame
 
-async def scroll_text(text: str, text_color: str = "#ffffff", bg_color: str = "#000000"):
+# Single worker thread for SPI writes: keeps frames in order and off the event loop
+_spi_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+def _shuffled_phrases():
+    """Yield PHRASES in random order, reshuffling after each full pass."""
+    rng = random.Random()
+    phrases = list(PHRASES)
+    while True:
+        rng.shuffle(phrases)
+        yield from phrases
+
+_phrase_iter = _shuffled_phrases()
+
+async def _wait_for_stop(stop_event: asyncio.Event, timeout: float) -> bool:
+    """Sleep for up to timeout seconds, returning True as soon as stop_event is set."""
+    try:
+        await asyncio.wait_for(stop_event.wait(), timeout)
+    except TimeoutError:
+        return False
+    return True
+
+async def scroll_text(text: str, text_color: str = "#ffffff", bg_color: str = "#000000",
+                      stop_event: asyncio.Event | None = None):
     """Scroll text vertically like Star Wars credits on the graphical LCD with pre-rendered image.
     
-    Auto-stops after 5 minutes.
+    Auto-stops after 5 minutes, or as soon as stop_event is set (the display is
+    left as-is for the next message to paint over).
     """
+    if stop_event is None:
+        stop_event = asyncio.Event()
     try:
         # Configuration for the display (already in landscape: 320x240)
         DISPLAY_WIDTH = 320  # pixels (landscape mode)
         DISPLAY_HEIGHT = 240  # pixels (landscape mode)
         FONT_SIZE = 28
         LINE_SPACING = 6
-        SCROLL_SPEED = 3
+        SCROLL_SPEED = 3  # pixels per FRAME_DELAY (i.e. 300 pixels/second)
         FRAME_DELAY = 0.01
+        FRAME_PERIOD = 1 / 60  # Panel refreshes at 60Hz; faster frames are never seen
         MAX_SCROLL_TIME = 5 * 60  # 5 minutes in seconds
         # Note: MAX_CHARS_PER_LINE is a reference value. Actual wrapping uses pixel width
         # to properly handle emoji (which take ~3x the width of regular characters).
@@ -44,7 +73,8 @@ async def scroll_text(text: str, text_color: str = "#ffffff", bg_color: str = "#
         decorated_text = f"{separator_line}\n{text}\n{separator_line}"
         
         # PRE-RENDER: Create one tall image with all the text using text_renderer module
-        full_image = text_renderer.create_scrollable_text_image(
+        # (cached, so resubmitting the same message skips rendering)
+        full_image = text_renderer.cached_scrollable_text_image(
             text=decorated_text,
             display_width=DISPLAY_WIDTH,
             font_size=FONT_SIZE,
@@ -56,50 +86,92 @@ async def scroll_text(text: str, text_color: str = "#ffffff", bg_color: str = "#
         
         total_text_height = full_image.height
         
-        # SCROLL: Loop through the pre-rendered image
-        y_position = -DISPLAY_HEIGHT  # Start with text below screen
-        start_time = time.time()
+        # FRAME BUFFER: Convert the tall image to a NumPy array of the panel's pixel
+        # format (RGB888) once; frames are sent straight from it without PIL.
+        # While the text fills the screen a frame is just a view of its rows;
+        # partial frames are copied into one of two reusable arrays, so the next
+        # frame can be prepared while the previous one is being sent.
+        arr = np.asarray(full_image)
+        bg_frame = np.full((DISPLAY_HEIGHT, DISPLAY_WIDTH, 3), ImageColor.getrgb(bg_color)[:3], dtype=np.uint8)
+        frame_index = 0
+        frame_bufs = [bg_frame.copy() for _ in range(2)]
+        
+        # SCROLL: Loop through the pre-rendered image. The position is derived from
+        # elapsed time, so slow frames make the text jump further instead of lagging.
+        scroll_cycle = total_text_height + DISPLAY_HEIGHT  # Text starts below screen
+        pixels_per_second = SCROLL_SPEED / FRAME_DELAY
 
         # Cache LCD instance and display reference once (avoid repeated lookups)
         lcd = waveshare_lcd.LcdController.instance()
         display_device = lcd.display if lcd else None
 
-        while True:
-            # Check if 5 minutes have elapsed
-            elapsed_time = time.time() - start_time
-            if elapsed_time > MAX_SCROLL_TIME:
-                # Stop scrolling and clear display
-                waveshare_lcd.clear(bg_color=bg_color)
-                break
-            
-            # Create display frame by cropping the tall image
-            frame = text_renderer.create_scroll_frame(
-                full_image=full_image,
-                y_position=y_position,
-                display_width=DISPLAY_WIDTH,
-                display_height=DISPLAY_HEIGHT,
-                bg_color=bg_color
-            )
-            # Display the frame (no rotation needed - display is already landscape)
-            if display_device:
+        # Frame pacing runs on the event loop's monotonic clock
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        next_tick = start_time
+        pending_display = None
+
+        # Bind the per-frame calls to locals (saves attribute lookups every frame)
+        now = loop.time
+        run_in_executor = loop.run_in_executor
+        create_scroll_frame = text_renderer.create_scroll_frame
+        blit_frame = lcd.blit_frame if display_device else None
+        is_stopped = stop_event.is_set
+
+        try:
+            while not is_stopped():
+                # Check if 5 minutes have elapsed
+                elapsed_time = now() - start_time
+                if elapsed_time > MAX_SCROLL_TIME:
+                    # Stop scrolling and clear display (queued behind any in-flight frame)
+                    await run_in_executor(_spi_executor, waveshare_lcd.clear, bg_color)
+                    break
+                
+                # Position for this moment, looping back once the text has scrolled off
+                y_position = int(elapsed_time * pixels_per_second) % scroll_cycle - DISPLAY_HEIGHT
+                
+                # Get the visible rows of the tall image (a view, or copied into a frame buffer)
+                frame_arr = create_scroll_frame(
+                    arr=arr,
+                    y_position=y_position,
+                    frame_arr=frame_bufs[frame_index],
+                    bg_frame=bg_frame
+                )
+                
+                # Wait for the previous frame to finish sending before queueing this one
+                if pending_display is not None:
+                    try:
+                        await pending_display
+                    except Exception:
+                        # If display fails, ignore and continue; device may be disposed concurrently
+                        pass
+                    pending_display = None
+                
+                # Display the frame on the SPI worker (no rotation needed - display is already landscape);
+                # the controller only sends the band of rows that differs from what's on the panel
+                if display_device:
+                    pending_display = run_in_executor(_spi_executor, blit_frame, frame_arr)
+                frame_index ^= 1
+                
+                # Wait for the next refresh; if behind, drop the missed frames instead of queueing
+                next_tick += FRAME_PERIOD
+                delay = next_tick - now()
+                if delay <= 0:
+                    next_tick = now()
+                if await _wait_for_stop(stop_event, max(delay, 0)):
+                    break
+        finally:
+            # Collect the in-flight frame on every exit (stop, timeout or cancel) so a
+            # failed write is ignored here rather than reported as never retrieved
+            if pending_display is not None:
                 try:
-                    display_device.display(frame)
+                    await pending_display
                 except Exception:
-                    # If display fails, ignore and continue; device may be disposed concurrently
                     pass
             
-            # Move position
-            y_position += SCROLL_SPEED
-            
-            # Loop back when text has scrolled off completely
-            if y_position >= total_text_height:
-                y_position = -DISPLAY_HEIGHT
-            
-            await asyncio.sleep(FRAME_DELAY)
-            
     except asyncio.CancelledError:
-        # Task was cancelled, clean up
-        waveshare_lcd.clear(bg_color="#000000")
+        # Task was cancelled, clean up (queued behind any in-flight frame)
+        await asyncio.get_running_loop().run_in_executor(_spi_executor, waveshare_lcd.clear, "#000000")
         raise
 
 @asynccontextmanager
@@ -107,7 +179,12 @@ async def lifespan(app: FastAPI):
     # Startup: Initialize LCD
     waveshare_lcd.init()
     yield
-    # Shutdown: Clear and dispose LCD resources
+    # Shutdown: Stop scrolling and let the SPI worker drain before disposing
+    if current_scroll_task is not None and not current_scroll_task.done():
+        current_scroll_task.cancel()
+        await asyncio.wait({current_scroll_task})
+    _spi_executor.shutdown(wait=True)
+    # Clear and dispose LCD resources
     waveshare_lcd.dispose()
 
 app = FastAPI(lifespan=lifespan)
@@ -120,12 +197,13 @@ async def home(request: Request):
 
 @app.post("/display")
 async def display_text(data: DisplayText, background_tasks: BackgroundTasks):
-    global current_scroll_task
+    global current_scroll_task, current_stop_event
     
-    # Cancel any existing scroll task
+    # Stop any existing scroll task; it wakes immediately and leaves the screen
+    # for the new message to repaint instead of clearing it first
     if current_scroll_task is not None and not current_scroll_task.done():
-        current_scroll_task.cancel()
-        # Wait for the task to finish cancelling without directly awaiting the task
+        current_stop_event.set()
+        # Wait for the task to finish without directly awaiting the task
         try:
             done, pending = await asyncio.wait({current_scroll_task}, return_when=asyncio.ALL_COMPLETED)
             for fut in done:
@@ -140,15 +218,16 @@ async def display_text(data: DisplayText, background_tasks: BackgroundTasks):
             await asyncio.sleep(0)
     
     # Always scroll the text (Star Wars style) with custom colors
+    current_stop_event = asyncio.Event()
     current_scroll_task = asyncio.create_task(
-        scroll_text(data.text, data.textColor, data.backgroundColor)
+        scroll_text(data.text, data.textColor, data.backgroundColor, current_stop_event)
     )
     return {"status": "success", "scrolling": True}
 
 @app.get("/random-phrase")
 async def get_random_phrase():
-    """Get a random phrase with emoji"""
-    phrase = random.choice(PHRASES)
+    """Get a random phrase with emoji (no repeats until every phrase has been shown)"""
+    phrase = next(_phrase_iter)
     return {"phrase": phrase}
 
 if __name__ == "__main__":
@@ -4,7 +4,9 @@ Handles pre-rendering of text into tall images for efficient scrolling.
 """
 
 from PIL import Image, ImageDraw, ImageFont
-import textwrap
+from itertools import accumulate
+import functools
+import os
 
 # Configuration constants
 # When text contains emoji, they take ~3x the width of regular characters
@@ -12,7 +14,64 @@ import textwrap
 TEXT_MARGIN_PX = 10  # Pixels of margin on each side of display
 EMOJI_WIDTH_MULTIPLIER = 3  # Approximate: emoji ≈ 3 regular chars in width
 
+# Common emoji Unicode ranges
+EMOJI_RANGES = (
+    (0x1F600, 0x1F64F),  # Emoticons
+    (0x1F300, 0x1F5FF),  # Misc Symbols and Pictographs
+    (0x1F680, 0x1F6FF),  # Transport and Map
+    (0x1F1E0, 0x1F1FF),  # Regional indicators (flags)
+    (0x2600, 0x26FF),    # Misc symbols
+    (0x2700, 0x27BF),    # Dingbats
+    (0xFE00, 0xFE0F),    # Variation selectors
+    (0x1F900, 0x1F9FF),  # Supplemental Symbols and Pictographs
+    (0x1FA00, 0x1FA6F),  # Chess Symbols
+    (0x1FA70, 0x1FAFF),  # Symbols and Pictographs Extended-A
+    (0x2300, 0x23FF),    # Misc Technical
+    (0x203C, 0x3299),    # Various symbols
+)
+_EMOJI_MIN_CODE = min(start for start, _ in EMOJI_RANGES)
 
+# 256-codepoint pages (code >> 8) that lie entirely inside an emoji range,
+# and pages that only partially overlap one and need the full range check
+_EMOJI_FULL_PAGES = frozenset(
+    page for start, end in EMOJI_RANGES
+    for page in range(start >> 8, (end >> 8) + 1)
+    if start <= page << 8 and (page << 8) + 0xFF <= end
+)
+_EMOJI_PARTIAL_PAGES = frozenset(
+    page for start, end in EMOJI_RANGES
+    for page in range(start >> 8, (end >> 8) + 1)
+) - _EMOJI_FULL_PAGES
+
+# Variation selectors and zero-width joiner: not drawn and take no width
+_SKIP_CODEPOINTS = frozenset(range(0xFE00, 0xFE10)) | {0x200D}
+_SKIP_TABLE = dict.fromkeys(_SKIP_CODEPOINTS)  # str.translate table that deletes them
+
+
+# Font files that don't exist; skipped on later lookups instead of re-probed
+_MISSING_FONT_PATHS = set()
+
+
+@functools.lru_cache(maxsize=32)
+def _load_font(path, size):
+    """
+    Load a TrueType font, reusing the face for repeated (path, size) lookups.
+    
+    Returns None if the font can't be opened. Only a missing file is remembered for
+    every size; other errors (e.g. a bitmap font at an unsupported size) are cached
+    for this (path, size) alone.
+    """
+    if path in _MISSING_FONT_PATHS:
+        return None
+    try:
+        return ImageFont.truetype(path, size)
+    except (FileNotFoundError, OSError):
+        if not os.path.exists(path):
+            _MISSING_FONT_PATHS.add(path)
+        return None
+
+
+@functools.lru_cache(maxsize=8)
 def get_font(size=16):
     """Get a font for rendering text."""
     font_paths = [
@@ -24,23 +83,31 @@ def get_font(size=16):
     ]
     
     for font_path in font_paths:
-        try:
-            return ImageFont.truetype(font_path, size)
-        except (FileNotFoundError, OSError):
-            continue
+        font = _load_font(font_path, size)
+        if font is not None:
+            return font
     
     return ImageFont.load_default()
 
 
+def _load_emoji_font():
+    """Load Noto Color Emoji at its only bitmap size (109), or None if unavailable."""
+    return _load_font("/usr/share/fonts/truetype/noto/NotoColorEmoji.ttf", 109)
+
+
+# Loaded once at import; every emoji measurement and render shares it
+_EMOJI_FONT = _load_emoji_font()
+
+
 def get_emoji_font(size=109):
     """
     Get Noto Color Emoji font for emoji rendering.
     Returns None if font is not available.
+    
+    NotoColorEmoji is bitmap-only at 109px, so size is ignored; emoji are
+    scaled after rendering instead.
     """
-    try:
-        return ImageFont.truetype("/usr/share/fonts/truetype/noto/NotoColorEmoji.ttf", size)
-    except (FileNotFoundError, OSError):
-        return None
+    return _EMOJI_FONT
 
 
 def is_emoji_char(char):
@@ -52,24 +119,16 @@ def is_emoji_char(char):
         return False
     
     code = ord(char)
+    if code < _EMOJI_MIN_CODE:
+        return False
     
-    # Common emoji Unicode ranges
-    emoji_ranges = [
-        (0x1F600, 0x1F64F),  # Emoticons
-        (0x1F300, 0x1F5FF),  # Misc Symbols and Pictographs
-        (0x1F680, 0x1F6FF),  # Transport and Map
-        (0x1F1E0, 0x1F1FF),  # Regional indicators (flags)
-        (0x2600, 0x26FF),    # Misc symbols
-        (0x2700, 0x27BF),    # Dingbats
-        (0xFE00, 0xFE0F),    # Variation selectors
-        (0x1F900, 0x1F9FF),  # Supplemental Symbols and Pictographs
-        (0x1FA00, 0x1FA6F),  # Chess Symbols
-        (0x1FA70, 0x1FAFF),  # Symbols and Pictographs Extended-A
-        (0x2300, 0x23FF),    # Misc Technical
-        (0x203C, 0x3299),    # Various symbols
-    ]
+    page = code >> 8
+    if page in _EMOJI_FULL_PAGES:
+        return True
+    if page not in _EMOJI_PARTIAL_PAGES:
+        return False
     
-    for start, end in emoji_ranges:
+    for start, end in EMOJI_RANGES:
         if start <= code <= end:
             return True
     
@@ -88,109 +147,195 @@ def calculate_text_width(text, font, emoji_font_size=28):
     Returns:
         Total width in pixels
     """
-    # Create a temporary draw object to measure text
-    temp_img = Image.new('RGB', (1, 1))
-    draw = ImageDraw.Draw(temp_img)
+    if _EMOJI_FONT is None:
+        # Without the emoji font the whole line is drawn with the regular font
+        return font.getlength(text)
     
-    emoji_font = get_emoji_font(size=109)
     emoji_scale = emoji_font_size / 109.0
     scaled_emoji_size = int((109 + 40) * emoji_scale)  # Include padding
     
     total_width = 0
-    i = 0
-    while i < len(text):
-        char = text[i]
-        
-        # Skip variation selectors and zero-width joiners
-        if ord(char) in range(0xFE00, 0xFE10) or char == '\u200D':
-            i += 1
-            continue
-        
-        # Check if character is an emoji
-        if emoji_font and is_emoji_char(char):
+    for is_emoji, segment in split_emoji_runs(text):
+        if is_emoji:
             # Emoji takes up scaled size
             total_width += scaled_emoji_size
         else:
-            # Regular character
-            char_bbox = draw.textbbox((0, 0), char, font=font)
-            char_width = char_bbox[2] - char_bbox[0]
-            total_width += char_width
-        
-        i += 1
+            # Regular text run, measured the same way it is drawn
+            total_width += font.getlength(segment)
     
     return total_width
 
 
-def render_text_with_emoji(draw, position, text, font, text_color, emoji_font_size=28):
+@functools.lru_cache(maxsize=512)
+def split_emoji_runs(text):
+    """
+    Split text into runs of regular text and single emoji.
+    
+    Variation selectors and zero-width joiners are dropped. Cached per text, since
+    every line is split once to measure it and again to render it.
+    
+    Args:
+        text: Text string possibly containing emoji
+    
+    Returns:
+        Tuple of (is_emoji, segment) tuples in text order
+    """
+    runs = []
+    run = []
+    # Drop variation selectors and zero-width joiners in one pass
+    for char in text.translate(_SKIP_TABLE):
+        if is_emoji_char(char):
+            if run:
+                runs.append((False, "".join(run)))
+                run = []
+            runs.append((True, char))
+        else:
+            run.append(char)
+    
+    if run:
+        runs.append((False, "".join(run)))
+    
+    return tuple(runs)
+
+
+@functools.lru_cache(maxsize=8)
+def font_ascii_widths(font):
+    """
+    Tabulate the advance width of every ASCII character for a font.
+    
+    Args:
+        font: Regular font for text
+    
+    Returns:
+        List of 128 widths in pixels, indexed by codepoint
+    """
+    return [font.getlength(chr(code)) for code in range(128)]
+
+
+def measure_chars(text, font, emoji_w):
+    """
+    Measure the advance width of every character in text.
+    
+    Args:
+        text: Text string possibly containing emoji
+        font: Regular font for text
+        emoji_w: Width of a rendered emoji, or None to measure emoji with the regular font
+    
+    Returns:
+        List of widths in pixels, one per character (variation selectors and ZWJ are 0)
+    """
+    ascii_widths = font_ascii_widths(font)
+    widths = []
+    for char in text:
+        code = ord(char)
+        if code < 128:
+            # ASCII fast path: table lookup instead of a FreeType call
+            widths.append(ascii_widths[code])
+        elif code in _SKIP_CODEPOINTS:
+            widths.append(0)
+        elif emoji_w is not None and is_emoji_char(char):
+            widths.append(emoji_w)
+        else:
+            widths.append(font.getlength(char))
+    return widths
+
+
+@functools.lru_cache(maxsize=512)
+def _emoji_tile(char, emoji_font_size=28, bg_color="#000000"):
+    """
+    Render a single emoji at native size, scale it to match the text and flatten it onto bg_color.
+    
+    The tile is cropped to the emoji's visible pixels so the opaque paste doesn't paint
+    background over the descenders of the line above. Cached per
+    (char, emoji_font_size, bg_color); callers must treat the result as read-only.
+    
+    Args:
+        char: Emoji character
+        emoji_font_size: Target size for emoji rendering
+        bg_color: Background color the emoji is composited onto (hex string or RGB tuple)
+    
+    Returns:
+        (RGB PIL Image, (dx, dy)) tuple, where (dx, dy) is the offset of the cropped
+        tile within the padded emoji box; the image is None if the glyph has no visible pixels
+    """
+    emoji_scale = emoji_font_size / 109.0
+    
+    # Create temporary image for emoji with padding
+    padding = 20
+    temp_size = 109 + padding * 2
+    emoji_img = Image.new('RGBA', (temp_size, temp_size), (0, 0, 0, 0))
+    emoji_draw = ImageDraw.Draw(emoji_img)
+    
+    # Draw emoji at native size
+    emoji_draw.text((padding, padding), char, font=_EMOJI_FONT, embedded_color=True)
+    
+    # Scale emoji to match text (BILINEAR: indistinguishable from LANCZOS at ~30px, and cheaper)
+    scaled_size = int(temp_size * emoji_scale)
+    emoji_img = emoji_img.resize((scaled_size, scaled_size), Image.Resampling.BILINEAR)
+    
+    # Keep only the visible part, composited onto the (opaque) background
+    bbox = emoji_img.getchannel('A').getbbox()
+    if bbox is None:
+        return None, (0, 0)
+    emoji_img = emoji_img.crop(bbox)
+    tile = Image.new('RGB', emoji_img.size, bg_color)
+    tile.paste(emoji_img, (0, 0), emoji_img)
+    return tile, bbox[:2]
+
+
+def render_text_with_emoji(image, draw, position, text, font, text_color, emoji_font_size=28, bg_color="#000000"):
     """
     Render text with emoji support by compositing emoji glyphs from Noto Color Emoji.
     
+    Regular text is drawn one run at a time; emoji are pasted from the glyph cache
+    as opaque tiles, so image must be filled with bg_color where they land.
+    
     Args:
-        draw: PIL ImageDraw object
+        image: PIL Image that draw renders into (emoji are pasted onto it)
+        draw: PIL ImageDraw object for image
         position: (x, y) tuple for text position
         text: Text string possibly containing emoji
         font: Regular font for text
         text_color: Color for regular text (hex string or RGB tuple)
         emoji_font_size: Target size for emoji rendering
+        bg_color: Background color of image (hex string or RGB tuple)
     """
     x, y = position
     
-    # Try to load emoji font
-    emoji_font = get_emoji_font(size=109)  # Native size for NotoColorEmoji
-    
-    if emoji_font is None:
+    if _EMOJI_FONT is None:
         # Fallback: use regular text rendering without emoji
         draw.text(position, text, fill=text_color, font=font)
         return
     
-    # Get text height for scaling emoji
-    bbox = draw.textbbox((0, 0), "Ay", font=font)
-    text_height = bbox[3] - bbox[1]
-    
     # Scale factor to match emoji to text height
     emoji_scale = emoji_font_size / 109.0
-    scaled_emoji_size = int(109 * emoji_scale)
-    
-    # Process text character by character
-    i = 0
-    while i < len(text):
-        char = text[i]
-        
-        # Skip variation selectors and zero-width joiners
-        if ord(char) in range(0xFE00, 0xFE10) or char == '\u200D':
-            i += 1
-            continue
+    padding = 20
+    emoji_width = int((109 + padding * 2) * emoji_scale)
+    image_width = image.width
+    
+    for is_emoji, segment in split_emoji_runs(text):
+        # Everything from here on is past the right edge
+        if x >= image_width:
+            break
         
-        # Check if character is an emoji using Unicode ranges
-        if is_emoji_char(char):
-            # Create temporary image for emoji with padding
-            padding = 20
-            temp_size = 109 + padding * 2
-            emoji_img = Image.new('RGBA', (temp_size, temp_size), (0, 0, 0, 0))
-            emoji_draw = ImageDraw.Draw(emoji_img)
-            
-            # Draw emoji at native size
-            emoji_draw.text((padding, padding), char, font=emoji_font, embedded_color=True)
-            
-            # Scale emoji to match text
-            scaled_size = int(temp_size * emoji_scale)
-            emoji_img = emoji_img.resize((scaled_size, scaled_size), Image.Resampling.LANCZOS)
-            
-            # Paste emoji onto main image
-            base_img = draw._image
-            paste_y = int(y - padding * emoji_scale)  # Adjust for padding
-            base_img.paste(emoji_img, (int(x), paste_y), emoji_img)
+        if is_emoji:
+            if x + emoji_width > 0:
+                # Reuse the pre-scaled, pre-composited emoji glyph
+                emoji_img, (dx, dy) = _emoji_tile(segment, emoji_font_size, bg_color)
+                
+                # Paste emoji onto main image (no mask needed, the tile is opaque)
+                if emoji_img is not None:
+                    paste_y = int(y - padding * emoji_scale)  # Adjust for padding
+                    image.paste(emoji_img, (int(x) + dx, paste_y + dy))
             
-            # Advance x position
-            x += scaled_size
+            # Advance x position by the full padded box, as before cropping
+            x += emoji_width
         else:
-            # Regular character
-            draw.text((x, y), char, fill=text_color, font=font)
-            char_bbox = draw.textbbox((0, 0), char, font=font)
-            char_width = char_bbox[2] - char_bbox[0]
-            x += char_width
-        
-        i += 1
+            # Regular text run in one draw call, unless it ends left of the image
+            run_width = font.getlength(segment)
+            if x + run_width > 0:
+                draw.text((x, y), segment, fill=text_color, font=font)
+            x += run_width
 
 
 def wrap_text_with_emoji(text, font, max_width_px, emoji_font_size=28):
@@ -209,55 +354,42 @@ def wrap_text_with_emoji(text, font, max_width_px, emoji_font_size=28):
     if not text.strip():
         return [""]
     
-    words = text.split()
+    # Measure every character once; any span's width is then a prefix-sum difference
+    line = " ".join(text.split())
+    emoji_w = None
+    if _EMOJI_FONT is not None:
+        emoji_w = int((109 + 40) * (emoji_font_size / 109.0))  # Include padding
+    cum = list(accumulate(measure_chars(line, font, emoji_w), initial=0))
+    
     lines = []
-    current_line = ""
+    line_start = None  # Index in line where the current output line starts
+    line_end = 0
+    word_start = 0
     
-    for word in words:
-        # Try adding the word to current line
-        test_line = current_line + (" " if current_line else "") + word
-        test_width = calculate_text_width(test_line, font, emoji_font_size)
+    for word in line.split(" "):
+        word_end = word_start + len(word)
         
-        if test_width <= max_width_px:
-            # Word fits, add it
-            current_line = test_line
+        if line_start is not None and cum[word_end] - cum[line_start] <= max_width_px:
+            # Word fits (with its leading space), add it
+            line_end = word_end
         else:
-            # Word doesn't fit
-            if current_line:
-                # Save current line and start new one
-                lines.append(current_line)
-                current_line = word
-                
-                # Check if single word is too long
-                if calculate_text_width(word, font, emoji_font_size) > max_width_px:
-                    # Break long word character by character
-                    current_line = ""
-                    char_line = ""
-                    for char in word:
-                        test_char_line = char_line + char
-                        if calculate_text_width(test_char_line, font, emoji_font_size) <= max_width_px:
-                            char_line = test_char_line
-                        else:
-                            if char_line:
-                                lines.append(char_line)
-                            char_line = char
-                    current_line = char_line
-            else:
-                # Current line is empty, word is too long, break it
-                char_line = ""
-                for char in word:
-                    test_char_line = char_line + char
-                    if calculate_text_width(test_char_line, font, emoji_font_size) <= max_width_px:
-                        char_line = test_char_line
-                    else:
-                        if char_line:
-                            lines.append(char_line)
-                        char_line = char
-                current_line = char_line
+            # Word doesn't fit: save current line and start a new one with the word
+            if line_start is not None:
+                lines.append(line[line_start:line_end])
+            line_start = word_start
+            
+            # Break long word character by character
+            for i in range(word_start + 1, word_end):
+                if cum[i + 1] - cum[line_start] > max_width_px:
+                    lines.append(line[line_start:i])
+                    line_start = i
+            line_end = word_end
+        
+        word_start = word_end + 1
     
     # Add remaining text
-    if current_line:
-        lines.append(current_line)
+    if line_start is not None:
+        lines.append(line[line_start:line_end])
     
     return lines if lines else [""]
 
@@ -316,48 +448,72 @@ def create_scrollable_text_image(text, display_width=320, font_size=28, line_spa
             x = (display_width - text_width) // 2
             
             # Render text with emoji support
-            render_text_with_emoji(draw, (x, y_offset), line, font, text_color, emoji_font_size=font_size)
+            render_text_with_emoji(full_image, draw, (x, y_offset), line, font, text_color,
+                                   emoji_font_size=font_size, bg_color=bg_color)
         
         y_offset += line_height
     
     return full_image
 
 
-def create_scroll_frame(full_image, y_position, display_width=320, display_height=240, bg_color="#000000"):
+@functools.lru_cache(maxsize=8)
+def cached_scrollable_text_image(text, display_width=320, font_size=28, line_spacing=6,
+                                 text_color="#ffffff", bg_color="#000000", max_chars_per_line=18):
+    """
+    Cached version of create_scrollable_text_image() for repeated messages.
+    
+    Resubmitting the same text and colors skips layout and emoji compositing.
+    The returned image is shared between callers and must be treated as read-only.
+    """
+    return create_scrollable_text_image(
+        text=text,
+        display_width=display_width,
+        font_size=font_size,
+        line_spacing=line_spacing,
+        text_color=text_color,
+        bg_color=bg_color,
+        max_chars_per_line=max_chars_per_line
+    )
+
+
+def create_scroll_frame(arr, y_position, frame_arr, bg_frame):
     """
-    Create a single frame by cropping the pre-rendered tall image.
+    Get the visible rows of the pre-rendered tall image as a display-sized frame.
+    
+    Works on NumPy arrays so the scroll loop never allocates a PIL image per frame.
+    While the text fills the whole screen the frame is a zero-copy view of arr;
+    otherwise the visible rows are copied into frame_arr and only the empty areas
+    are painted.
     
     Args:
-        full_image: Pre-rendered tall image
-        y_position: Current scroll position (0 = top of full_image)
-        display_width: Display width in pixels
-        display_height: Display height in pixels
-        bg_color: Background color for empty areas
+        arr: (height, width, 3) uint8 array of the pre-rendered tall image
+        y_position: Current scroll position (0 = top of arr)
+        frame_arr: (display_height, width, 3) uint8 array, updated in place for partial frames
+        bg_frame: Array shaped like frame_arr, filled with the background color
     
     Returns:
-        PIL Image object for the current frame
+        Array holding the current frame (a read-only view of arr, or frame_arr)
     """
-    total_text_height = full_image.height
-    frame = Image.new('RGB', (display_width, display_height), color=bg_color)
-    
-    # Calculate which part of the full_image to show
-    if y_position < 0:
-        # Text hasn't fully entered yet - show bottom portion
-        src_y = 0
-        src_height = min(total_text_height, display_height + y_position)
-        dest_y = -y_position
-        if src_height > 0:
-            crop = full_image.crop((0, src_y, display_width, src_y + src_height))
-            frame.paste(crop, (0, dest_y))
-    elif y_position + display_height <= total_text_height:
-        # Text is fully visible - crop from full_image
-        crop = full_image.crop((0, y_position, display_width, y_position + display_height))
-        frame.paste(crop, (0, 0))
-    else:
-        # Text is scrolling off the top
-        src_height = total_text_height - y_position
-        if src_height > 0:
-            crop = full_image.crop((0, y_position, display_width, total_text_height))
-            frame.paste(crop, (0, 0))
-    
-    return frame
+    total_text_height = arr.shape[0]
+    display_height = frame_arr.shape[0]
+    
+    # Calculate which rows of the full image are visible and where they land
+    src_row = max(0, y_position)
+    dst_row = max(0, -y_position)
+    rows = max(0, min(display_height - dst_row, total_text_height - src_row))
+    dst_end = dst_row + rows
+    
+    if rows == display_height:
+        # Text fills the screen - use the rows in place
+        return arr[src_row:src_row + rows]
+    
+    frame_arr[dst_row:dst_end] = arr[src_row:src_row + rows]
+    
+    # Text hasn't fully entered yet - background above it
+    if dst_row > 0:
+        frame_arr[:dst_row] = bg_frame[:dst_row]
+    # Text is scrolling off the top - background below it
+    if dst_end < display_height:
+        frame_arr[dst_end:] = bg_frame[dst_end:]
+    
+    return frame_arr
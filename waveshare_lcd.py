@@ -4,15 +4,37 @@ Driver for Waveshare 2-inch Mini LCD (240x320) with ST7789VW controller
 Uses luma.lcd library for SPI communication
 """
 
+import logging
+import os
 from luma.core.interface.serial import spi
-from luma.core.render import canvas
 from luma.lcd.device import st7789
+from PIL import ImageColor
+import functools
+import numpy as np
 import RPi.GPIO as GPIO
 
+log = logging.getLogger(__name__)
+
 # Default GPIO pins and constants
 BACKLIGHT_PIN = 18  # GPIO 18 for backlight control (BCM2835 column in wiring table)
 DC_PIN = 25
 RST_PIN = 27
+# SPI clock; override with LCD_SPI_HZ (luma accepts 0.5-52 MHz in fixed steps, e.g. 40000000 for long wires)
+SPI_BUS_SPEED_HZ = int(os.environ.get("LCD_SPI_HZ", 52000000))
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_color(color):
+    """Parse a PIL color string (e.g. "#102030", "white") once, returning an RGB tuple."""
+    return ImageColor.getrgb(color)[:3]
+
+
+@functools.lru_cache(maxsize=4)
+def _solid_frame(rgb, height, width):
+    """Build a read-only (height, width, 3) RGB888 frame filled with rgb, once per color."""
+    frame = np.full((height, width, 3), rgb, dtype=np.uint8)
+    frame.setflags(write=False)
+    return frame
 
 
 class LcdController:
@@ -22,7 +44,7 @@ class LcdController:
       - Use LcdController.get_instance() to get the singleton (will initialize on first call).
       - Call LcdController.clear_instance() from FastAPI lifespan shutdown to dispose resources.
 
-    Public methods mirror the previous module-level API: init(), clear(), backlight_on(), backlight_off(), set_backlight(), dispose().
+    Public methods mirror the module-level API: init(), clear(), blit_frame(), backlight_on(), backlight_off(), set_backlight(), dispose().
     """
 
     _instance = None
@@ -31,6 +53,16 @@ class LcdController:
         # instance attributes
         self.display = None
         self.backlight_pwm = None
+        # Duty cycle last applied to the backlight, None if unknown
+        self._last_duty = None
+        # Copy of the last frame sent by blit_frame(), or None when the panel contents are unknown
+        self._prev_frame = None
+        # SPI interface and spidev's writebytes2 (None if unavailable) for pixel data
+        self._serial = None
+        self._writebytes2 = None
+        # Pre-built CASET (every write is full width) and full-screen RASET parameters
+        self._caset_full = None
+        self._raset_full = None
 
     @classmethod
     def instance(cls):
@@ -65,7 +97,7 @@ class LcdController:
             device=0,
             gpio_DC=DC_PIN,
             gpio_RST=RST_PIN,
-            bus_speed_hz=40000000,
+            bus_speed_hz=SPI_BUS_SPEED_HZ,
             transfer_size=4096,
         )
 
@@ -81,18 +113,30 @@ class LcdController:
             v_offset=0,
         )
 
+        # luma's serial.data() sends via writebytes(), which copies every 4 KB chunk
+        # into a list of ints; writebytes2() reads the buffer directly, any length
+        self._serial = serial
+        self._writebytes2 = getattr(getattr(serial, "_spi", None), "writebytes2", None)
+
+        # The display geometry is fixed, so the window parameters for full-width writes
+        # are built once (same bytes as luma's set_window; end bounds are inclusive)
+        w, h = self.display.width, self.display.height
+        self._caset_full = [0x00, 0x00, (w - 1) >> 8, (w - 1) & 0xFF]
+        self._raset_full = [0x00, 0x00, (h - 1) >> 8, (h - 1) & 0xFF]
+
         # Start backlight PWM
         GPIO.setup(BACKLIGHT_PIN, GPIO.OUT)
         self.backlight_pwm = GPIO.PWM(BACKLIGHT_PIN, 1000)
         try:
             self.backlight_pwm.start(100)
+            self._last_duty = 100
         except Exception:
             # If PWM start fails, ensure attribute remains consistent
             self.backlight_pwm = None
 
-        print(f"Display initialized: {self.display.width}x{self.display.height}")
-        print(f"Backlight: GPIO {BACKLIGHT_PIN} PWM at 100%")
-        print(f"DC: GPIO {DC_PIN}, RST: GPIO {RST_PIN}")
+        log.info("Display initialized: %dx%d", self.display.width, self.display.height)
+        log.info("Backlight: GPIO %d PWM at 100%%", BACKLIGHT_PIN)
+        log.info("DC: GPIO %d, RST: GPIO %d", DC_PIN, RST_PIN)
 
         # Clear display on init
         self.clear()
@@ -100,40 +144,101 @@ class LcdController:
     def clear(self, bg_color="#000000"):
         """Clear the display to specified color."""
         if self.display:
-            with canvas(self.display) as draw:
-                draw.rectangle(self.display.bounding_box, fill=bg_color)
+            log.debug("Clearing display to %s", bg_color)
+            # Solid frames are cached per color, so no image is drawn or converted
+            frame = _solid_frame(_parse_color(bg_color), self.display.height, self.display.width)
+            self.blit_frame(frame)
+
+    def blit_frame(self, frame):
+        """Send a full-screen frame, transmitting only the band of rows that changed.
+
+        frame is a (height, width, 3) uint8 array in the panel's format: RGB888, 3 bytes
+        per pixel, as luma's st7789 sets COLMOD to 18-bit (e.g. np.asarray() of an RGB
+        image). The bytes go straight to SPI, skipping luma's display(), which converts
+        the image and builds a Python list of every byte.
+
+        Each frame is diffed against the previous one sent (clear() included); the first
+        frame, and the one after a failed write, go out whole.
+        """
+        if not self.display:
+            return
+        prev = self._prev_frame
+        if prev is None:
+            self._write_rows(frame, 0, self.display.height)
+            self._prev_frame = np.array(frame)
+            return
+
+        dirty = np.flatnonzero(np.any(prev != frame, axis=(1, 2)))
+        if dirty.size == 0:
+            return
+        y0, y1 = int(dirty[0]), int(dirty[-1]) + 1
+        # Forget the previous frame until the write succeeds (a failed write leaves the panel unknown)
+        self._prev_frame = None
+        self._write_rows(frame[y0:y1], y0, y1)
+        prev[y0:y1] = frame[y0:y1]
+        self._prev_frame = prev
+
+    def _write_rows(self, pixels, y0, y1):
+        """Set the panel's window to full-width rows y0..y1 and write pixels into it."""
+        # ST7789 commands go out with DC low and their parameters as data (DC high)
+        serial = self._serial
+        serial.command(0x2A)  # CASET: columns 0..width-1
+        serial.data(self._caset_full)
+        serial.command(0x2B)  # RASET: rows y0..y1-1
+        if y0 == 0 and y1 == self.display.height:
+            serial.data(self._raset_full)
+        else:
+            serial.data([y0 >> 8, y0 & 0xFF, (y1 - 1) >> 8, (y1 - 1) & 0xFF])
+        serial.command(0x2C)  # RAMWR: pixel data follows
+        buf = memoryview(pixels).cast("B")
+        if self._writebytes2 is None:
+            self.display.data(buf)
+            return
+        serial.data(b"")  # raises DC; an empty buffer writes nothing
+        self._writebytes2(buf)
 
     def backlight_on(self):
         """Turn on the backlight (100%)."""
-        if self.backlight_pwm:
-            try:
-                self.backlight_pwm.ChangeDutyCycle(100)
-            except Exception:
-                pass
+        self._set_duty(100)
 
     def backlight_off(self):
         """Turn off the backlight (0%)."""
-        if self.backlight_pwm:
-            try:
-                self.backlight_pwm.ChangeDutyCycle(0)
-            except Exception:
-                pass
+        self._set_duty(0)
 
     def set_backlight(self, brightness):
         """Set backlight brightness (0-100)."""
-        if self.backlight_pwm:
-            try:
-                self.backlight_pwm.ChangeDutyCycle(max(0, min(100, int(brightness))))
-            except Exception:
-                pass
+        self._set_duty(brightness)
+
+    def _set_duty(self, brightness):
+        """Apply a backlight duty cycle (clamped to 0-100), skipping the PWM call if it's already set.
+
+        0 stops the PWM and holds the pin low rather than running the 1 kHz carrier
+        at 0%. RPi.GPIO frees a stopped PWM, so leaving 0 starts a new one.
+        Invalid values are ignored.
+        """
+        if not self.backlight_pwm:
+            return
+        try:
+            duty = max(0, min(100, int(brightness)))
+            if duty == self._last_duty:
+                return
+            if duty == 0:
+                self.backlight_pwm.stop()
+                GPIO.output(BACKLIGHT_PIN, GPIO.LOW)
+            elif self._last_duty == 0:
+                self.backlight_pwm = GPIO.PWM(BACKLIGHT_PIN, 1000)
+                self.backlight_pwm.start(duty)
+            else:
+                self.backlight_pwm.ChangeDutyCycle(duty)
+            self._last_duty = duty
+        except Exception:
+            pass
 
     def dispose(self):
         """Cleanly stop PWM, clear display, and cleanup GPIO resources."""
         # Try to turn display to black first
         try:
-            if self.display:
-                with canvas(self.display) as draw:
-                    draw.rectangle(self.display.bounding_box, fill="#000000")
+            self.clear("#000000")
         except Exception:
             pass
 
@@ -142,12 +247,18 @@ class LcdController:
             if self.backlight_pwm:
                 self.backlight_pwm.stop()
                 self.backlight_pwm = None
+                self._last_duty = None
                 self.backlight_off()
         except Exception:
             pass
 
         # Clear display reference
         self.display = None
+        self._prev_frame = None
+        self._serial = None
+        self._writebytes2 = None
+        self._caset_full = None
+        self._raset_full = None
 
         # Attempt to cleanup GPIO (safe to call multiple times)
         try:
@@ -166,6 +277,10 @@ def clear(bg_color="#000000"):
     LcdController.instance().clear(bg_color)
 
 
+def blit_frame(frame):
+    LcdController.instance().blit_frame(frame)
+
+
 def backlight_on():
     LcdController.instance().backlight_on()
 
@@ -187,15 +302,14 @@ if __name__ == '__main__':
     """Test the display hardware"""
     from PIL import Image, ImageDraw, ImageFont
     
+    logging.basicConfig(level=logging.INFO)
     print("Initializing display...")
     init()
 
     lcd = LcdController.instance()
 
     print("Drawing white screen...")
-    if lcd.display:
-        with canvas(lcd.display) as draw:
-            draw.rectangle(lcd.display.bounding_box, fill="white")
+    clear("white")
     
     import time
     time.sleep(2)
@@ -218,8 +332,7 @@ if __name__ == '__main__':
     
     draw.text((80, 100), "Hello\nWorld!", fill='white', font=font)
     
-    if lcd.display:
-        lcd.display.display(test_img)
+    blit_frame(np.asarray(test_img))
     time.sleep(3)
     
     print("Clearing display...")